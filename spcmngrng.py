@@ -5,9 +5,12 @@ A Directory Treemap Viewer inspired by SpaceMonger.
 Features:
 - A top toolbar with small buttons that show an icon on the left and text on the right:
     • Open (which turns to Stop while scanning),
-    • Reload (rescans the originally loaded directory),
+    • Reload (updates the directories that changed since the scan),
+    • Rescan (rescans the originally loaded directory),
     • Go Top and Go Up (to navigate the scanned tree),
     • Run – opens the currently selected file (or folder) in its associated program.
+    • Stay on Filesystem – a checkable option (off by default) that keeps the scan from
+      descending into other mounted filesystems, like du -x.
 - A status bar that shows messages such as “Please open a directory”, 
   and during scanning it shows the actual file/folder currently being processed.
 - A viewport (the central widget) that displays the treemap.
@@ -29,7 +32,10 @@ Features:
 - Double–clicking on a directory block (in its non–child “label” area) zooms into that folder.
   When zooming in the folder’s computed hue is used as the new base so that its color remains.
 - “Go Up” shows the parent (until the originally scanned directory, when it is disabled).
-- Rescanning (via Reload or a new Open) always does a full scan without “zooming.”
+- Reload re-lists only the directories seen to change since the scan started, and does a
+  full scan when none were seen (or the tree is too big to watch). Directory watching does
+  not notice files growing in place, so use Rescan (or a new Open), which always does a
+  full scan without “zooming,” when in doubt.
 - The scan runs in a background thread so that the Open button becomes a Stop button while scanning.
 - A single left–click on a block selects it (or unselects it if it was already selected).
   The selected block is highlighted by decreasing its brightness.
@@ -37,50 +43,139 @@ Features:
   or if a directory is selected, opens the file browser in that folder.
 """
 
-import os, sys, time, pwd, grp, stat, hashlib
+import os, sys, time, pwd, grp, stat, threading, zlib
+from array import array
+from functools import lru_cache
+from itertools import accumulate
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QToolBar,
                              QAction, QFileDialog, QStatusBar, QToolTip, QStyle)
-from PyQt5.QtGui import QPainter, QColor, QFont, QPen, QIcon, QDesktopServices
-from PyQt5.QtCore import Qt, QRectF, QObject, QThread, pyqtSignal, QSize, QUrl
+from PyQt5.QtGui import QPainter, QColor, QFont, QPen, QIcon, QPixmap, QDesktopServices
+from PyQt5.QtCore import (Qt, QRectF, QObject, QThread, QTimer, QFileSystemWatcher,
+                          pyqtSignal, QSize, QUrl)
 
 # --------- Excluded Folders ---------
 EXCLUDED_DIRS = ['/proc', '/mnt', '/sys', '/dev', '/run']
+_EXCLUDED_EXACT = frozenset(EXCLUDED_DIRS)
+_EXCLUDED_PREFIXES = tuple(ex + os.sep for ex in EXCLUDED_DIRS)
+
+# --------- Scan Concurrency ---------
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+PARTIAL_INTERVAL = 0.5  # s between snapshots of a scan in progress
+
+# Listing through a directory fd makes each DirEntry.stat() an fstatat()
+# relative to that fd, so the kernel resolves one name instead of a full path.
+SCANDIR_FD = os.scandir in os.supports_fd
+DIR_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_CLOEXEC', 0)
+
+# --------- Layout Limits ---------
+MAX_VISIBLE_CHILDREN = 2000  # larger directories show the rest as "others"
+
+# --------- Change Watching ---------
+# Reload only re-lists directories that changed, but that needs a watch on
+# every scanned directory; larger trees (inotify watches are a per-user limit)
+# and large batches of changes fall back to a full rescan. Directory watches
+# only see entries being added, removed or renamed, not files written in place;
+# Rescan always does a full scan.
+MAX_WATCHED_DIRS = 4096
+MAX_INCREMENTAL_DIRS = 256
 
 def is_excluded(path):
-    abs_path = os.path.abspath(path)
-    for ex in EXCLUDED_DIRS:
-        if abs_path == ex or abs_path.startswith(ex + os.sep):
-            return True
-    return False
+    """path must be absolute and normalised; scan_directory makes the root so
+    and every other path is joined onto it."""
+    return path in _EXCLUDED_EXACT or path.startswith(_EXCLUDED_PREFIXES)
 
 # --------- Utility: Compute an initial hue from a path ---------
 def compute_initial_hue(path):
-    h = hashlib.md5(path.encode('utf-8')).hexdigest()
-    return int(h, 16) % 360
+    # Only needs to be stable and well spread, not cryptographic.
+    return zlib.crc32(os.fsencode(path)) % 360
 
 # --------- Data Model: Node and scanning ---------
 class Node:
+    __slots__ = ('_path', 'name', 'is_dir', 'size', 'children', 'parent', '_stat', 'hue',
+                 'cum_sizes', '_tooltip')
+
     def __init__(self, path, name, is_dir, size=0, children=None, parent=None):
-        self.path = path
-        self.name = name
+        self._path = path  # only set on the scan root; see the path property
+        self.name = sys.intern(name)  # basenames like __init__.py repeat a lot
         self.is_dir = is_dir
         self.size = size
-        self.children = children if children is not None else []
+        if children is None:
+            children = [] if is_dir else ()  # files share one empty tuple
+        self.children = children
         self.parent = parent
-        self.stat = None  # will hold os.stat_result
-        self.hue = None   # computed hue for this node when displayed
+        self._stat = None  # os.stat_result, fetched on first access
+        self.hue = None    # computed hue for this node when displayed
+        self.cum_sizes = None  # running totals of the largest children, see scan_directory
+        self._tooltip = None   # text built by format_tooltip on first hover
+
+    @property
+    def path(self):
+        # Children only keep their basename; the full path is rebuilt from the
+        # parent chain when it is actually needed (tooltip, Run, listing).
+        names = []
+        node = self
+        while node._path is None:
+            names.append(node.name)
+            node = node.parent
+        return os.path.join(node._path, *reversed(names))
+
+    @property
+    def stat(self):
+        # Only tooltips need the full metadata, so it is not kept from the scan.
+        if self._stat is None:
+            try:
+                self._stat = os.lstat(self.path)
+            except OSError:
+                return None
+        return self._stat
+
+_size_key = attrgetter('size')
 
 class ScanCancelledException(Exception):
     pass
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB', 'EB', 'ZB', 'YB')
+
 def human_readable_size(size):
-    for unit in ['B','KB','MB','GB','TB']:
-        if size < 1024:
-            return f"{size:.1f} {unit}"
-        size /= 1024
-    return f"{size:.1f} PB"
+    if size < 1024:
+        return f"{size} B"
+    # Every unit is 2**10 times the previous one, so the unit follows directly
+    # from the bit length; dividing by a power of two is exact.
+    idx = min((int(size).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size / (1 << (idx * 10)):.1f} {_SIZE_UNITS[idx]}"
+
+# Owner and group names go through NSS (files, LDAP, ...) and a tree usually
+# has only a handful of distinct ids, so the lookups are memoized.
+@lru_cache(maxsize=1024)
+def user_name(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return None
+
+@lru_cache(maxsize=1024)
+def group_name(gid):
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return None
+
+# ctime() only shows whole seconds, and files copied or unpacked together
+# share timestamps, so formatting is memoized on the second.
+@lru_cache(maxsize=1024)
+def format_time(seconds):
+    return time.ctime(seconds)
 
 def format_tooltip(node):
+    # Hovering back and forth over the same blocks is common, and the text
+    # only changes when the node does (see refresh_directory).
+    if node._tooltip is None:
+        node._tooltip = _build_tooltip(node)
+    return node._tooltip
+
+def _build_tooltip(node):
     lines = [
         f"Name: {node.name}",
         f"Path: {node.path}",
@@ -88,21 +183,15 @@ def format_tooltip(node):
     ]
     if node.stat:
         st = node.stat
-        lines.append(f"Modified: {time.ctime(st.st_mtime)}")
-        lines.append(f"Accessed: {time.ctime(st.st_atime)}")
-        lines.append(f"Created: {time.ctime(st.st_ctime)}")
-        try:
-            uid = st.st_uid
-            user = pwd.getpwuid(uid).pw_name
-            lines.append(f"Owner: {user} ({uid})")
-        except Exception:
-            pass
-        try:
-            gid = st.st_gid
-            group = grp.getgrgid(gid).gr_name
-            lines.append(f"Group: {group} ({gid})")
-        except Exception:
-            pass
+        lines.append(f"Modified: {format_time(st.st_mtime_ns // 1000000000)}")
+        lines.append(f"Accessed: {format_time(st.st_atime_ns // 1000000000)}")
+        lines.append(f"Created: {format_time(st.st_ctime_ns // 1000000000)}")
+        user = user_name(st.st_uid)
+        if user is not None:
+            lines.append(f"Owner: {user} ({st.st_uid})")
+        group = group_name(st.st_gid)
+        if group is not None:
+            lines.append(f"Group: {group} ({st.st_gid})")
         try:
             perms = stat.filemode(st.st_mode)
             lines.append(f"Permissions: {perms}")
@@ -110,7 +199,89 @@ def format_tooltip(node):
             pass
     return "\n".join(lines)
 
-def scan_directory(path, stop_callback=None, update_callback=None, parent=None):
+def _list_directory(node, root_dev=None):
+    """List one directory into node.children and return the subdirectories to
+    descend into. Each directory is listed by exactly one task, so the node's
+    children list is never shared between threads. With root_dev set, mount
+    points of other filesystems are listed but not descended into."""
+    # This loop runs once per file in the tree, so globals and bound methods
+    # are looked up once up front.
+    add_child = node.children.append
+    subdirs = []
+    add_subdir = subdirs.append
+    make_node = Node
+    excluded = is_excluded
+    dir_path = node.path
+    fd = None
+    try:
+        if SCANDIR_FD:
+            # DirEntry.stat() calls fstatat() on this fd, so it stays open
+            # until the listing is done.
+            fd = os.open(dir_path, DIR_OPEN_FLAGS)
+            it = os.scandir(fd)
+        else:
+            it = os.scandir(dir_path)
+        with it:
+            for entry in it:
+                # The DirEntry carries the file type from readdir() and caches
+                # its lstat(), so no extra isdir/islink/lstat round trips.
+                try:
+                    child_is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    child_is_dir = False
+                if child_is_dir:
+                    child = make_node(None, entry.name, True, 0, None, node)
+                    add_child(child)
+                    if excluded(os.path.join(dir_path, entry.name)):
+                        continue
+                    if root_dev is not None:
+                        try:
+                            if entry.stat(follow_symlinks=False).st_dev != root_dev:
+                                continue
+                        except OSError:
+                            continue
+                    add_subdir(child)
+                    continue
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    size = 0
+                add_child(make_node(None, entry.name, False, size, None, node))
+    except OSError:
+        pass
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return subdirs
+
+def _finish_directory(node):
+    # Children are sorted largest first and the running totals of the ones that
+    # can be laid out are kept, so painting never has to sort or sum them.
+    children = node.children
+    children.sort(key=_size_key, reverse=True)
+    node.cum_sizes = array('q', accumulate(map(_size_key, children[:MAX_VISIBLE_CHILDREN])))
+    node.size = sum(map(_size_key, children))
+    node._tooltip = None
+
+def _snapshot(root, found):
+    """A stand-alone copy of root's first level for showing a scan in progress.
+    Subdirectories get the bytes found under them so far and no children."""
+    snap = Node(root._path, root.name, True)
+    snap._stat = root._stat
+    add_child = snap.children.append
+    for child in root.children:
+        size = found.get(child, 0) if child.is_dir else child.size
+        add_child(Node(None, child.name, child.is_dir, size, None, snap))
+    _finish_directory(snap)
+    return snap
+
+def scan_directory(path, stop_callback=None, update_callback=None, one_file_system=False,
+                   directories=None, partial_callback=None):
+    """Scan path into a Node tree. If directories is a list, every directory
+    that was listed is appended to it, parents before their subdirectories.
+    partial_callback, if given, receives a snapshot of the tree so far (see
+    _snapshot) every PARTIAL_INTERVAL seconds."""
+    path = os.path.abspath(path)
     if update_callback:
         update_callback(path)
     if stop_callback and stop_callback():
@@ -120,83 +291,156 @@ def scan_directory(path, stop_callback=None, update_callback=None, parent=None):
         s = os.lstat(path)
     except Exception:
         s = None
-    is_dir = os.path.isdir(path) and not os.path.islink(path)
-    if is_dir and parent is not None and is_excluded(path):
-        try:
-            s = os.lstat(path)
-        except Exception:
-            s = None
-        node = Node(path, name, True, 0, parent=parent)
-        node.stat = s
-        return node
-
-    if is_dir:
-        node = Node(path, name, True, 0, parent=parent)
-        node.stat = s
-        total = 0
-        children = []
-        try:
-            for entry in os.scandir(path):
-                if stop_callback and stop_callback():
-                    raise ScanCancelledException()
-                child = scan_directory(entry.path, stop_callback, update_callback, parent=node)
-                total += child.size
-                children.append(child)
-        except Exception:
-            pass
-        node.children = children
-        node.size = total
-        return node
-    else:
-        size = s.st_size if s else 0
-        node = Node(path, name, False, size, parent=parent)
-        node.stat = s
-        return node
+    is_dir = s is not None and stat.S_ISDIR(s.st_mode)
+    root = Node(path, name, is_dir, 0 if is_dir else (s.st_size if s else 0))
+    root._stat = s
+    if not is_dir:
+        return root
+
+    # Phase 1: directories are listed concurrently; scandir()/lstat() release
+    # the GIL, so the pool keeps several I/O requests in flight. This thread
+    # only hands out work and records the order directories were found in.
+    root_dev = s.st_dev if one_file_system else None
+    dirs = [root]
+    # For snapshots, the bytes of files found so far are added up per
+    # top-level directory as each listing completes.
+    tops = {} if partial_callback else None  # future -> (its node, top-level directory)
+    found = {}  # top-level directory -> bytes found under it so far
+    next_partial = None  # set once the root itself has been listed
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        future = pool.submit(_list_directory, root, root_dev)
+        pending = {future}
+        if tops is not None:
+            tops[future] = (root, None)
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            if stop_callback and stop_callback():
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise ScanCancelledException()
+            for future in done:
+                subdirs = future.result()
+                if tops is not None:
+                    node, top = tops.pop(future)
+                    if top is None:
+                        next_partial = time.monotonic() + PARTIAL_INTERVAL
+                    else:
+                        # Subdirectories are still 0 here, so this is just the files.
+                        found[top] = found.get(top, 0) + sum(map(_size_key, node.children))
+                for subdir in subdirs:
+                    if update_callback:
+                        update_callback(subdir.path)
+                    dirs.append(subdir)
+                    task = pool.submit(_list_directory, subdir, root_dev)
+                    pending.add(task)
+                    if tops is not None:
+                        tops[task] = (subdir, subdir if top is None else top)
+            if next_partial is not None and time.monotonic() >= next_partial:
+                partial_callback(_snapshot(root, found))
+                next_partial = time.monotonic() + PARTIAL_INTERVAL
+
+    # Phase 2: directories were recorded after their parents, so walking the
+    # list backwards sees every subdirectory before the directory holding it.
+    for node in reversed(dirs):
+        _finish_directory(node)
+    if directories is not None:
+        directories.extend(dirs)
+    return root
+
+def refresh_directory(node, root_dev=None):
+    """Re-list an already scanned directory in place and bring the sizes of it
+    and its ancestors up to date. Files are added, updated or dropped; known
+    subdirectories keep their subtrees. Returns (removed, added): the children
+    that disappeared (now detached, parent None) and the new subdirectories,
+    which are left empty and still have to be scanned."""
+    scratch = Node(node.path, node.name, True)
+    descend = set(map(id, _list_directory(scratch, root_dev)))
+    old = {child.name: child for child in node.children}
+    children = []
+    removed = []
+    added = []
+    for child in scratch.children:
+        known = old.pop(child.name, None)
+        if known is not None and known.is_dir == child.is_dir:
+            if not known.is_dir:
+                known.size = child.size
+                known._stat = known._tooltip = None
+            children.append(known)
+            continue
+        if known is not None:
+            removed.append(known)
+        child.parent = node
+        if child.is_dir:
+            _finish_directory(child)
+            if id(child) in descend:
+                added.append(child)
+        children.append(child)
+    removed.extend(old.values())
+    for gone in removed:
+        gone.parent = None
+    node.children = children
+    node._stat = None  # its mtime changed with the listing
+    while node is not None:
+        _finish_directory(node)
+        node = node.parent
+    return removed, added
 
 # --------- Squarified Treemap Algorithm ---------
-def worst_ratio(row, length):
-    total = sum(row)
-    if length == 0 or total == 0:
+def worst_ratio(total, smallest, largest, length):
+    # The aspect ratio max(side²/r, r/side²) is largest at one of the row's
+    # extremes, so a running sum/min/max is enough to evaluate a row in O(1).
+    if length == 0 or total == 0 or smallest == 0:
         return float('inf')
     side = total / length
-    worst = 0
-    for r in row:
-        if r == 0:
-            return float('inf')
-        ratio = max(side * side / r, r / (side * side))
-        worst = max(worst, ratio)
-    return worst
+    side2 = side * side
+    return max(side2 / smallest, largest / side2)
 
 def squarify(areas, x, y, width, height):
     rects = []
-    areas = areas[:]
-    while areas:
-        row = [areas.pop(0)]
+    emit = rects.append
+    inf = float('inf')
+    n = len(areas)
+    i = 0
+    while i < n:
+        length = width if width >= height else height
+        start = i
+        total = smallest = largest = areas[i]
+        i += 1
+        current_worst = worst_ratio(total, smallest, largest, length)
+        # Candidate test of worst_ratio() written out inline: only the running
+        # sum/min/max change per step, as in d3-hierarchy's squarify, and this
+        # loop runs once per child, so it avoids a Python call per candidate.
+        while i < n:
+            a = areas[i]
+            new_total = total + a
+            new_smallest = a if a < smallest else smallest
+            new_largest = a if a > largest else largest
+            if length == 0 or new_smallest == 0:
+                new_worst = inf
+            else:
+                side = new_total / length
+                side2 = side * side
+                new_worst = side2 / new_smallest
+                if new_largest / side2 > new_worst:
+                    new_worst = new_largest / side2
+            if current_worst < new_worst:
+                break
+            total, smallest, largest, current_worst = new_total, new_smallest, new_largest, new_worst
+            i += 1
         if width >= height:
-            current_worst = worst_ratio(row, width)
-            while areas and current_worst >= worst_ratio(row + [areas[0]], width):
-                row.append(areas.pop(0))
-                current_worst = worst_ratio(row, width)
-            total_row = sum(row)
-            row_height = total_row / width
+            row_height = total / width
             rx = x
-            for r in row:
-                rw = r / row_height
-                rects.append((rx, y, rw, row_height))
+            for j in range(start, i):
+                rw = areas[j] / row_height
+                emit((rx, y, rw, row_height))
                 rx += rw
             y += row_height
             height -= row_height
         else:
-            current_worst = worst_ratio(row, height)
-            while areas and current_worst >= worst_ratio(row + [areas[0]], height):
-                row.append(areas.pop(0))
-                current_worst = worst_ratio(row, height)
-            total_row = sum(row)
-            col_width = total_row / height
+            col_width = total / height
             ry = y
-            for r in row:
-                rh = r / col_width
-                rects.append((x, ry, col_width, rh))
+            for j in range(start, i):
+                rh = areas[j] / col_width
+                emit((x, ry, col_width, rh))
                 ry += rh
             x += col_width
             width -= col_width
@@ -209,26 +453,45 @@ class ScanWorker(QObject):
     error = pyqtSignal(str)
     status_update = pyqtSignal(str)
     
-    def __init__(self, path):
+    def __init__(self, path, one_file_system=False):
         super().__init__()
         self.path = path
-        self._stopped = False
+        self.one_file_system = one_file_system
+        self.current_path = None  # polled by the GUI thread, see MainWindow
+        self.directories = []     # every listed directory, for MainWindow's watcher
+        self.partial_root = None  # latest snapshot of the scan, polled like current_path
+        self._stop_event = threading.Event()
         
     def stop(self):
-        self._stopped = True
+        self._stop_event.set()
+
+    def _report_progress(self, path):
+        # A plain attribute store: the GUI polls it on a timer instead of
+        # receiving a queued cross-thread signal for every directory.
+        self.current_path = path
+
+    def _report_partial(self, root):
+        # Snapshots are never modified after this, so the GUI can draw them.
+        self.partial_root = root
         
     def run(self):
         try:
             self.status_update.emit(f"Scanning ... {self.path}")
             result = scan_directory(self.path, 
-                                    stop_callback=lambda: self._stopped,
-                                    update_callback=lambda p: self.status_update.emit("Scanning: " + p))
+                                    stop_callback=self._stop_event.is_set,
+                                    update_callback=self._report_progress,
+                                    one_file_system=self.one_file_system,
+                                    directories=self.directories,
+                                    partial_callback=self._report_partial)
+            self.current_path = self.partial_root = None
             self.status_update.emit("Scan completed.")
             self.finished.emit(result)
         except ScanCancelledException:
+            self.current_path = self.partial_root = None
             self.status_update.emit("Scan cancelled.")
             self.cancelled.emit()
         except Exception as e:
+            self.current_path = self.partial_root = None
             self.status_update.emit(f"Scan error: {str(e)}")
             self.error.emit(str(e))
 
@@ -237,16 +500,36 @@ class TreemapWidget(QWidget):
     zoomedIn = pyqtSignal(object)
     selectionChanged = pyqtSignal(object)
     
-    MIN_VISIBLE_AREA = 500
+    MIN_VISIBLE_AREA = 500  # px², smaller blocks get no label or sub-treemap
+    MIN_CHILD_AREA = 4.0    # px², smaller children are folded into "others"
+    HIT_CELL = 32  # px, bucket size of the hit-test grid
+    TOOLTIP_DELAY = 100  # ms the pointer has to rest before the tooltip updates
+    # Multiplying a fill by this grey scales its HSV value from 220 to 120,
+    # the selected shade, while black borders and labels stay black.
+    SELECTION_SHADE = QColor(139, 139, 139)
+    OTHERS_COLOR = QColor(220, 220, 220)
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.root_node = None
         self.current_node = None
         self.baseHueStack = []
-        self.rect_map = []      # List of (QRectF, Node, depth)
-        self.zoomable_map = []  # List of (full QRectF, inner QRectF, Node, depth)
+        # Hit-test geometry is kept as plain floats; QRectF copies per node per
+        # paint were only ever used for contains() checks.
+        self.rect_map = []      # List of (x, y, w, h, Node, depth)
+        self.zoomable_map = []  # List of ((x, y, w, h), (inner x, y, w, h), Node, depth)
+        self._hit_grid = {}     # (cell x, cell y) -> rect_map entries, deepest first
+        self._hover_node = None  # node whose tooltip is showing
+        self._hover_pos = None   # last pointer position, where the tooltip opens
+        self._tooltip_timer = QTimer(self)
+        self._tooltip_timer.setSingleShot(True)
+        self._tooltip_timer.setInterval(self.TOOLTIP_DELAY)
+        self._tooltip_timer.timeout.connect(self._update_tooltip)
         self.selected_node = None
+        self._layout_cache = {}  # (id(node), x, y, w, h) -> squarify rects
+        self._color_cache = {}   # (hue, is_dir) -> QColor
+        self._covered = {}       # Node -> part of its rect its children paint over
+        self._backbuffer = None  # QPixmap of the tree without the selection
         self.setMouseTracking(True)
         
     def set_root_node(self, node):
@@ -254,39 +537,191 @@ class TreemapWidget(QWidget):
         self.current_node = node
         self.baseHueStack = [compute_initial_hue(node.path)]
         self.selected_node = None
+        self._invalidate(layouts=True)
         self.update()
+
+    def _invalidate(self, layouts=False):
+        # Zoom changed: the rendered tree no longer matches what has to be shown,
+        # but cached layouts are keyed by geometry and stay valid. A new or
+        # changed tree (ids may be reused) or a resize also drops the layouts.
+        if layouts:
+            self._layout_cache.clear()
+        self._backbuffer = None
+
+    def clear(self):
+        self.root_node = None
+        self.current_node = None
+        self.selected_node = None
+        self._forget_geometry()
+        self.update()
+
+    def _forget_geometry(self):
+        # Hit testing must not find blocks of a tree that is no longer shown.
+        self._backbuffer = None
+        self.rect_map = []
+        self.zoomable_map = []
+        self._hit_grid = {}
+        self._covered = {}
+        self._hover_node = None
+
+    def resizeEvent(self, event):
+        self._invalidate(layouts=True)
+        super().resizeEvent(event)
         
     def paintEvent(self, event):
+        if not self.current_node:
+            self._forget_geometry()
+            painter = QPainter(self)
+            painter.setFont(QFont("Sans", 7))
+            painter.drawText(QRectF(0, 0, self.width(), self.height()), Qt.AlignCenter, "No data")
+            painter.end()
+            return
+        # The tree is rendered once into a back-buffer; selecting a block only
+        # blits it and darkens that one block.
+        if self._backbuffer is None:
+            self._render_backbuffer()
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._backbuffer)
+        self._paint_selection(painter)
+        painter.end()
+
+    def _render_backbuffer(self):
+        ratio = self.devicePixelRatioF()
+        # A pixmap lives in the windowing system's native format, so the blit
+        # in paintEvent needs no conversion.
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
         font = QFont("Sans", 7)
         painter.setFont(font)
         self.rect_map = []
         self.zoomable_map = []
+        self._covered = {}
         rect = QRectF(0, 0, self.width(), self.height())
-        if self.current_node:
-            self.draw_node(painter, self.current_node, rect, 0)
-        else:
-            painter.drawText(rect, Qt.AlignCenter, "No data")
+        # draw_node only records what to paint; it is flushed afterwards in a
+        # few batched calls instead of several painter calls per node.
+        self._fills = []    # per depth: {rgba: (QColor, [QRectF])}
+        self._borders = []  # [QRectF]
+        self._labels = []   # [(QRectF, text)]
+        # Font metrics are the same for every node of one render.
+        self._fm = painter.fontMetrics()
+        self._min_label_width = 2 * self._fm.averageCharWidth()
+        self.draw_node(painter, self.current_node, rect, 0, self.baseHueStack[-1])
+        self._flush_batches(painter)
+        self._fm = None
         painter.end()
+        self._backbuffer = pixmap
+        self._build_hit_grid()
+        self._hover_node = None
+
+    def _paint_selection(self, painter):
+        node = self.selected_node
+        if node is None:
+            return
+        for x, y, w, h, drawn, depth in self.rect_map:
+            if drawn is node:
+                break
+        else:
+            return
+        rect = QRectF(x, y, w, h)
+        covered = self._covered.get(node)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setCompositionMode(QPainter.CompositionMode_Multiply)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.SELECTION_SHADE)
+        painter.drawRects(self._frame_rects(rect, covered) if covered else [rect])
+
+    @staticmethod
+    def _frame_rects(rect, inner):
+        """The four strips of rect around inner: above, below, left, right."""
+        return [QRectF(rect.x(), rect.y(), rect.width(), inner.y() - rect.y()),
+                QRectF(rect.x(), inner.bottom(), rect.width(), rect.bottom() - inner.bottom()),
+                QRectF(rect.x(), inner.y(), inner.x() - rect.x(), inner.height()),
+                QRectF(inner.right(), inner.y(), rect.right() - inner.right(), inner.height())]
+
+    def _add_fill(self, depth, color, rect):
+        while len(self._fills) <= depth:
+            self._fills.append({})
+        layer = self._fills[depth]
+        bucket = layer.get(color.rgba())
+        if bucket is None:
+            layer[color.rgba()] = (color, [rect])
+        else:
+            bucket[1].append(rect)
+
+    def _flush_batches(self, painter):
+        # Fills go shallowest first so children cover their parent's sub-viewport;
+        # borders and labels never overlap a child, so they can all go last.
+        painter.setPen(Qt.NoPen)
+        for layer in self._fills:
+            for color, rects in layer.values():
+                painter.setBrush(color)
+                painter.drawRects(rects)
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(Qt.black, 1))
+        painter.drawRects(self._borders)
+        # Only the clip changes per label, so it is set directly rather than
+        # saving and restoring the whole painter state around each one.
+        align = Qt.AlignLeft | Qt.AlignVCenter
+        for label_rect, text in self._labels:
+            painter.setClipRect(label_rect)
+            painter.drawText(label_rect, align, text)
+        painter.setClipping(False)
+        self._fills = self._borders = self._labels = None
+
+    def _build_hit_grid(self):
+        # Bucket every drawn rect into the grid cells it overlaps so a hit test
+        # only looks at the handful of rects under the pointer. Buckets are
+        # ordered deepest first; among equal depths the last drawn comes first.
+        grid = {}
+        cell = self.HIT_CELL
+        for entry in reversed(self.rect_map):
+            x, y, w, h = entry[:4]
+            for gx in range(int(x // cell), int((x + w) // cell) + 1):
+                for gy in range(int(y // cell), int((y + h) // cell) + 1):
+                    bucket = grid.get((gx, gy))
+                    if bucket is None:
+                        grid[(gx, gy)] = [entry]
+                    else:
+                        bucket.append(entry)
+        for bucket in grid.values():
+            bucket.sort(key=lambda entry: entry[5], reverse=True)
+        self._hit_grid = grid
+
+    def _node_at(self, pos):
+        px, py = pos.x(), pos.y()
+        bucket = self._hit_grid.get((int(px // self.HIT_CELL), int(py // self.HIT_CELL)))
+        if bucket:
+            for x, y, w, h, node, depth in bucket:
+                if x <= px <= x + w and y <= py <= y + h:
+                    return node
+        return None
         
-    def draw_node(self, painter, node, rect, depth):
+    def draw_node(self, painter, node, rect, depth, base_hue):
         if rect.width() <= 0 or rect.height() <= 0:
             return
-        # Save for tooltip lookup.
-        self.rect_map.append((QRectF(rect), node, depth))
-        
-        base = self.baseHueStack[-1]
-        hue = (base + depth * 30) % 360
         if node.hue is None:
-            node.hue = hue
-        # Decrease brightness if selected.
-        value = 120 if self.selected_node == node else 220
-        col = QColor.fromHsv(node.hue, 150 if node.is_dir else 100, value)
-        painter.fillRect(rect, col)
-        pen = QPen(Qt.black, 1)
-        painter.setPen(pen)
-        painter.drawRect(rect)  # Outer 1px border
+            node.hue = (base_hue + depth * 30) % 360
+        # Only a few dozen distinct colours exist, so build each QColor once.
+        # The selected block is darkened later, over the back-buffer.
+        color_key = (node.hue, node.is_dir)
+        col = self._color_cache.get(color_key)
+        if col is None:
+            col = QColor.fromHsv(node.hue, 150 if node.is_dir else 100, 220)
+            self._color_cache[color_key] = col
+        if rect.width() < 1 or rect.height() < 1:
+            # A sliver thinner than a pixel can neither be pointed at nor show
+            # a border; it only has to cover its share of the parent's area.
+            self._add_fill(depth, col, rect)
+            return
+        # Save for tooltip lookup.
+        self.rect_map.append((rect.x(), rect.y(), rect.width(), rect.height(), node, depth))
+        self._borders.append(rect)  # Outer 1px border
+        if rect.width() * rect.height() < self.MIN_VISIBLE_AREA:
+            self._add_fill(depth, col, rect)
+            return
         
         # Layout internal margins.
         left_border = 1; right_border = 1; hpad = 2
@@ -296,7 +731,7 @@ class TreemapWidget(QWidget):
         inner_y = rect.y() + top_border
         inner_height = rect.height() - (top_border + bottom_border)
         
-        fm = painter.fontMetrics()
+        fm = self._fm
         L = fm.height()  # desired label height
         ideal_fixed = 2 + L + 2 + 2  # top padding + label + spacing + bottom padding
         
@@ -324,41 +759,38 @@ class TreemapWidget(QWidget):
                     label_height = remaining
                     top_padding = bottom_padding = 0
         
-        label_rect = QRectF(inner_x, inner_y + top_padding, inner_width, label_height)
-        painter.save()
-        painter.setClipRect(label_rect)
-        elided = fm.elidedText(node.name, Qt.ElideRight, int(label_rect.width()))
-        painter.drawText(label_rect, Qt.AlignLeft | Qt.AlignVCenter, elided)
-        painter.restore()
+        # Labels that can't fit a full line of text, or more than an ellipsis,
+        # are unreadable; skip them before any eliding work.
+        if rect.width() >= 20 and label_height >= L and inner_width > self._min_label_width:
+            label_rect = QRectF(inner_x, inner_y + top_padding, inner_width, label_height)
+            elided = fm.elidedText(node.name, Qt.ElideRight, int(label_rect.width()))
+            self._labels.append((label_rect, elided))
         
+        covered = None  # part of rect that children paint over
         if sub_view_height > 0:
             sub_view_rect = QRectF(inner_x, inner_y + top_padding + label_height + spacing,
                                    inner_width, sub_view_height)
-            full_rect = QRectF(rect)
-            self.zoomable_map.append((full_rect, QRectF(sub_view_rect), node, depth))
+            self.zoomable_map.append(((rect.x(), rect.y(), rect.width(), rect.height()),
+                                      (inner_x, sub_view_rect.y(), inner_width, sub_view_height),
+                                      node, depth))
             if node.is_dir and node.children and inner_width > 20 and sub_view_height > 20:
-                children = sorted(node.children, key=lambda n: n.size, reverse=True)
-                total = sum(child.size for child in children)
+                # The scan sorted the children largest first and kept running
+                # totals for the first MAX_VISIBLE_CHILDREN of them.
+                children = node.children
+                cum_sizes = node.cum_sizes
+                total = node.size
                 if total > 0:
-                    if len(children) > 2000:
-                        visible = children[:2000]
-                        othersSize = sum(child.size for child in children[2000:])
-                    else:
-                        visible = children
-                        othersSize = 0
-                    visibleTotal = sum(child.size for child in visible)
-                    EPSILON = 1e-6
-                    visArea = sub_view_rect.width() * sub_view_rect.height()
-                    if visibleTotal <= 0:
-                        scaledAreas = [visArea / len(visible)] * len(visible)
-                    else:
-                        scaledAreas = [((child.size if child.size > 0 else EPSILON) / visibleTotal) * visArea for child in visible]
-                    rects = squarify(scaledAreas, sub_view_rect.x(), sub_view_rect.y(),
-                                      sub_view_rect.width(), sub_view_rect.height())
-                    for child, r in zip(visible, rects):
-                        childRect = QRectF(*r)
-                        self.draw_node(painter, child, childRect, depth + 1)
-                    if othersSize > 0 and sub_view_rect.width() > 5 and sub_view_rect.height() > 5:
+                    covered = sub_view_rect
+                    # Children past MAX_VISIBLE_CHILDREN, or too small to cover
+                    # a pixel, are not laid out; they share one "others" block.
+                    min_size = total * self.MIN_CHILD_AREA / (sub_view_rect.width() * sub_view_rect.height())
+                    count = len(cum_sizes)
+                    while count > 0 and children[count - 1].size < min_size:
+                        count -= 1
+                    visible = children[:count]
+                    visibleTotal = cum_sizes[count - 1] if count else 0
+                    othersSize = total - visibleTotal
+                    if othersSize > 0:
                         fraction = visibleTotal / total
                         if sub_view_rect.width() >= sub_view_rect.height():
                             visRect = QRectF(sub_view_rect.x(), sub_view_rect.y(),
@@ -370,35 +802,64 @@ class TreemapWidget(QWidget):
                                              sub_view_rect.width() * fraction, sub_view_rect.height())
                             othersRect = QRectF(sub_view_rect.x() + sub_view_rect.width() * fraction, sub_view_rect.y(),
                                                   sub_view_rect.width() * (1 - fraction), sub_view_rect.height())
-                        painter.fillRect(othersRect, QColor(220, 220, 220))
-                        painter.setPen(QPen(Qt.black, 1))
-                        painter.drawRect(othersRect)
-                        elided_others = fm.elidedText("others", Qt.ElideRight, int(othersRect.width() - 4))
-                        painter.drawText(othersRect.adjusted(2, 2, -2, -2), Qt.AlignLeft | Qt.AlignVCenter, elided_others)
+                        self._add_fill(depth + 1, self.OTHERS_COLOR, othersRect)
+                        self._borders.append(othersRect)
+                        if othersRect.width() - 4 > self._min_label_width:
+                            elided_others = fm.elidedText("others", Qt.ElideRight, int(othersRect.width() - 4))
+                            self._labels.append((othersRect.adjusted(2, 2, -2, -2), elided_others))
+                    else:
+                        visRect = sub_view_rect
+                    # The tree does not change between scans, so a layout can be
+                    # reused for as long as the geometry it was made for, e.g.
+                    # when going back up to a block that was drawn before.
+                    key = (id(node), visRect.x(), visRect.y(), visRect.width(), visRect.height())
+                    rects = self._layout_cache.get(key)
+                    if rects is None:
+                        scale = visRect.width() * visRect.height() / visibleTotal if visibleTotal else 0
+                        scaledAreas = [child.size * scale for child in visible]
+                        rects = squarify(scaledAreas, visRect.x(), visRect.y(),
+                                          visRect.width(), visRect.height())
+                        self._layout_cache[key] = rects
+                    for child, r in zip(visible, rects):
+                        childRect = QRectF(*r)
+                        self.draw_node(painter, child, childRect, depth + 1, base_hue)
+        
+        if covered is None:
+            self._add_fill(depth, col, rect)
+        else:
+            # Children tile the sub-viewport completely, so only the frame
+            # around it (label strip and paddings) needs this node's colour.
+            self._covered[node] = covered
+            for strip in self._frame_rects(rect, covered):
+                self._add_fill(depth, col, strip)
         
     def mouseMoveEvent(self, event):
-        pos = event.pos()
-        target = None
-        max_depth = -1
-        for rect, node, depth in self.rect_map:
-            if rect.contains(pos) and depth >= max_depth:
-                target = node
-                max_depth = depth
+        # Nothing is looked up until the pointer rests: sweeping across many
+        # blocks only keeps pushing the timer back.
+        self._hover_pos = event.pos()
+        self._tooltip_timer.start()
+        super().mouseMoveEvent(event)
+
+    def _update_tooltip(self):
+        # Only rebuild the tooltip when the pointer rests on a different block,
+        # or when Qt has hidden it meanwhile (mouse press, display timeout).
+        target = self._node_at(self._hover_pos)
+        if target is self._hover_node and (target is None or QToolTip.isVisible()):
+            return
+        self._hover_node = target
         if target:
-            QToolTip.showText(self.mapToGlobal(event.pos()), format_tooltip(target), self)
+            QToolTip.showText(self.mapToGlobal(self._hover_pos), format_tooltip(target), self)
         else:
             QToolTip.hideText()
-        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        self._hover_node = None
+        self._tooltip_timer.stop()
+        super().leaveEvent(event)
         
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            pos = event.pos()
-            candidate = None
-            max_depth = -1
-            for rect, node, depth in self.rect_map:
-                if rect.contains(pos) and depth >= max_depth:
-                    candidate = node
-                    max_depth = depth
+            candidate = self._node_at(event.pos())
             if candidate is not None:
                 if self.selected_node == candidate:
                     self.selected_node = None
@@ -412,11 +873,14 @@ class TreemapWidget(QWidget):
         
     def mouseDoubleClickEvent(self, event):
         pos = event.pos()
+        px, py = pos.x(), pos.y()
         target = None
         max_depth = -1
         selected_depth = 0
-        for full_rect, inner_rect, node, depth in self.zoomable_map:
-            if full_rect.contains(pos) and not inner_rect.contains(pos) and depth >= max_depth:
+        for (x, y, w, h), (ix, iy, iw, ih), node, depth in self.zoomable_map:
+            in_full = x <= px <= x + w and y <= py <= y + h
+            in_inner = ix <= px <= ix + iw and iy <= py <= iy + ih
+            if in_full and not in_inner and depth >= max_depth:
                 target = node
                 max_depth = depth
                 selected_depth = depth
@@ -424,6 +888,7 @@ class TreemapWidget(QWidget):
             new_baseHue = target.hue if target.hue is not None else (self.baseHueStack[-1] + selected_depth * 30) % 360
             self.baseHueStack.append(new_baseHue)
             self.current_node = target
+            self._invalidate()
             self.zoomedIn.emit(target)
             self.update()
         super().mouseDoubleClickEvent(event)
@@ -433,13 +898,31 @@ class TreemapWidget(QWidget):
             self.current_node = self.current_node.parent
             if len(self.baseHueStack) > 1:
                 self.baseHueStack.pop()
+            self._invalidate()
             self.update()
             self.zoomedIn.emit(self.current_node)
             
+    def tree_changed(self):
+        """The loaded tree was updated in place. Removed nodes must not stay
+        zoomed into or selected, and everything drawn from the tree is stale."""
+        if not self._attached(self.current_node):
+            self.go_top()
+        if self.selected_node is not None and not self._attached(self.selected_node):
+            self.selected_node = None
+            self.selectionChanged.emit(None)
+        self._invalidate(layouts=True)
+        self.update()
+
+    def _attached(self, node):
+        while node is not None and node is not self.root_node:
+            node = node.parent
+        return node is not None
+
     def go_top(self):
         if self.root_node:
             self.current_node = self.root_node
             self.baseHueStack = [compute_initial_hue(self.root_node.path)]
+            self._invalidate()
             self.update()
             self.zoomedIn.emit(self.current_node)
 
@@ -467,6 +950,10 @@ class MainWindow(QMainWindow):
         self.reloadAction.triggered.connect(self.reload_directory)
         self.toolbar.addAction(self.reloadAction)
         
+        self.rescanAction = QAction(style.standardIcon(QStyle.SP_DialogResetButton), "Rescan", self)
+        self.rescanAction.triggered.connect(self.rescan_directory)
+        self.toolbar.addAction(self.rescanAction)
+        
         self.goTopAction = QAction(style.standardIcon(QStyle.SP_DesktopIcon), "Go Top", self)
         self.goTopAction.triggered.connect(self.go_top)
         self.toolbar.addAction(self.goTopAction)
@@ -480,6 +967,11 @@ class MainWindow(QMainWindow):
         self.runAction.setEnabled(False)
         self.toolbar.addAction(self.runAction)
         
+        self.oneFsAction = QAction(style.standardIcon(QStyle.SP_DriveHDIcon), "Stay on Filesystem", self)
+        self.oneFsAction.setCheckable(True)
+        self.oneFsAction.setToolTip("Do not descend into other mounted filesystems (like du -x)")
+        self.toolbar.addAction(self.oneFsAction)
+        
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         
@@ -488,7 +980,18 @@ class MainWindow(QMainWindow):
         self.scan_worker = None
         self.scanning = False
         
+        self.watcher = None
+        self.watched_dirs = {}     # path -> Node of every watched directory
+        self.changed_dirs = set()  # watched paths changed since the last scan
+        self.watch_root_dev = None  # st_dev to stay on, as in the last scan
+        self.scan_started_ns = 0    # wall clock at the start of the last scan
+        
+        self.progressTimer = QTimer(self)
+        self.progressTimer.setInterval(100)
+        self.progressTimer.timeout.connect(self.show_scan_progress)
+        
         self.reloadAction.setEnabled(False)
+        self.rescanAction.setEnabled(False)
         self.goTopAction.setEnabled(False)
         self.goUpAction.setEnabled(False)
         
@@ -499,6 +1002,7 @@ class MainWindow(QMainWindow):
         if self.scanning:
             if self.scan_worker:
                 self.scan_worker.stop()
+                self.progressTimer.stop()
                 self.statusBar.showMessage("Stopping scan...")
         else:
             directory = QFileDialog.getExistingDirectory(self, "Select Directory", os.getcwd())
@@ -506,13 +1010,13 @@ class MainWindow(QMainWindow):
                 self.start_scan(directory)
                 
     def start_scan(self, directory):
-        self.treemapWidget.root_node = None
-        self.treemapWidget.current_node = None
-        self.treemapWidget.selected_node = None
-        self.treemapWidget.update()
+        self.stop_watching()
+        self.treemapWidget.clear()
         self.loaded_directory = directory
+        self.scan_started_ns = time.time_ns()
         self.statusBar.showMessage(f"Scanning ... {directory}")
         self.reloadAction.setEnabled(False)
+        self.rescanAction.setEnabled(False)
         self.goTopAction.setEnabled(False)
         self.goUpAction.setEnabled(False)
         self.runAction.setEnabled(False)
@@ -521,7 +1025,7 @@ class MainWindow(QMainWindow):
         self.scanning = True
         
         self.scan_thread = QThread()
-        self.scan_worker = ScanWorker(directory)
+        self.scan_worker = ScanWorker(directory, self.oneFsAction.isChecked())
         self.scan_worker.moveToThread(self.scan_thread)
         self.scan_thread.started.connect(self.scan_worker.run)
         self.scan_worker.finished.connect(self.scan_finished)
@@ -531,30 +1035,133 @@ class MainWindow(QMainWindow):
         self.scan_worker.finished.connect(self.scan_thread.quit)
         self.scan_worker.finished.connect(self.scan_worker.deleteLater)
         self.scan_thread.finished.connect(self.scan_thread.deleteLater)
+        self.progressTimer.start()
         self.scan_thread.start()
+
+    def show_scan_progress(self):
+        worker = self.scan_worker
+        if worker is None:
+            return
+        path = worker.current_path
+        if path:
+            self.statusBar.showMessage("Scanning: " + path)
+        # Show the top level filling in while the scan runs.
+        partial = worker.partial_root
+        if partial is not None and partial is not self.treemapWidget.root_node:
+            self.treemapWidget.set_root_node(partial)
+            self.updateRunAction(None)
         
     def scan_finished(self, root_node):
+        self.progressTimer.stop()
         self.scanning = False
         self.openAction.setText("Open")
         self.reloadAction.setEnabled(True)
+        self.rescanAction.setEnabled(True)
         self.treemapWidget.set_root_node(root_node)
         self.update_navigation_buttons(self.treemapWidget.current_node)
+        self.watch_tree(root_node, self.scan_worker.directories, self.scan_worker.one_file_system)
         
     def scan_cancelled(self):
+        self.progressTimer.stop()
+        self.treemapWidget.clear()
         self.scanning = False
         self.openAction.setText("Open")
         self.reloadAction.setEnabled(self.loaded_directory is not None)
+        self.rescanAction.setEnabled(self.loaded_directory is not None)
         self.statusBar.showMessage("Scan cancelled.")
         
     def scan_error(self, error_msg):
+        self.progressTimer.stop()
+        self.treemapWidget.clear()
         self.scanning = False
         self.openAction.setText("Open")
         self.reloadAction.setEnabled(self.loaded_directory is not None)
+        self.rescanAction.setEnabled(self.loaded_directory is not None)
         self.statusBar.showMessage(f"Scan error: {error_msg}")
         
     def reload_directory(self):
+        if self.loaded_directory and not self.scanning:
+            if self.watcher is None or not self.apply_changes():
+                self.start_scan(self.loaded_directory)
+
+    def rescan_directory(self):
         if self.loaded_directory and not self.scanning:
             self.start_scan(self.loaded_directory)
+
+    def watch_tree(self, root_node, directories, one_file_system):
+        if len(directories) > MAX_WATCHED_DIRS:
+            return
+        self.watched_dirs = {node.path: node for node in directories}
+        self.watcher = QFileSystemWatcher(self)
+        failed = self.watcher.addPaths(list(self.watched_dirs))
+        # Unreadable directories cannot be watched, but they were scanned as
+        # empty anyway. Any other failure (e.g. out of inotify watches) would
+        # silently miss changes, so Reload goes back to full rescans.
+        if any(self.watched_dirs[path].children for path in failed):
+            self.stop_watching()
+            return
+        for path in failed:
+            del self.watched_dirs[path]
+        self.watch_root_dev = root_node.stat.st_dev if one_file_system else None
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        # The watches only exist from now on; directories modified while the
+        # scan ran are found by their mtime. The margin covers the coarser
+        # clock filesystems stamp with, and re-listing too many is harmless.
+        since = self.scan_started_ns - 1000000000
+        for path in self.watched_dirs:
+            try:
+                if os.lstat(path).st_mtime_ns >= since:
+                    self.changed_dirs.add(path)
+            except OSError:
+                self.changed_dirs.add(path)
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.deleteLater()
+            self.watcher = None
+        self.watched_dirs = {}
+        self.changed_dirs = set()
+
+    def directory_changed(self, path):
+        if path in self.watched_dirs:
+            if not self.changed_dirs:
+                self.statusBar.showMessage("Changes detected, Reload to update.")
+            self.changed_dirs.add(path)
+
+    def apply_changes(self):
+        """Update the loaded tree from the directories that changed since the
+        scan. Returns False if a full rescan is needed instead, which includes
+        the case that no change was seen at all: files written in place do not
+        show up as directory changes, so Reload should still pick them up."""
+        changed = self.changed_dirs
+        if not changed or len(changed) > MAX_INCREMENTAL_DIRS:
+            return False
+        # Parents go first, so directories removed with them are skipped.
+        for path in sorted(changed, key=len):
+            node = self.watched_dirs.get(path)
+            if node is None:
+                continue
+            removed, added = refresh_directory(node, self.watch_root_dev)
+            if added:
+                return False
+            self.unwatch([(os.path.join(path, gone.name), gone) for gone in removed])
+        self.changed_dirs = set()
+        self.treemapWidget.tree_changed()
+        self.statusBar.showMessage(f"Updated {len(changed)} changed directories. "
+                                   "Use Rescan to also pick up files changed in place.")
+        return True
+
+    def unwatch(self, subtrees):
+        paths = []
+        stack = [entry for entry in subtrees if entry[1].is_dir]
+        while stack:
+            path, node = stack.pop()
+            if self.watched_dirs.pop(path, None) is not None:
+                paths.append(path)
+            stack.extend((os.path.join(path, child.name), child)
+                         for child in node.children if child.is_dir)
+        if paths:
+            self.watcher.removePaths(paths)
             
     def go_top(self):
         self.treemapWidget.go_top()